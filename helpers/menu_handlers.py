@@ -2,11 +2,13 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
 from telegram.ext import ContextTypes
-import asyncio
 import base58
+import json
 import logging
+import os
 
 from helpers.wallet_tracker import start_periodic_task, get_wallet_balance  # Import the tracking function
+from helpers.task_supervisor import supervisor
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -66,6 +68,28 @@ def is_tracking(chat_id):
     user = user_data.get(chat_id)
     return bool(user and user.get('tasks'))
 
+def launch_tracking(chat_id, context, wallet):
+    # 'context' only needs a 'bot', so the Application works too when no update is at hand
+    user = user_data[chat_id]
+    wallet_address = wallet['address']
+
+    async def notify_gave_up(error):
+        await context.bot.send_message(chat_id=chat_id, text=f"Stopped tracking wallet {wallet['name']} after repeated errors. Use 'Start Tracking' to try again.")
+
+    def forget_task(task):
+        # Drop the entry once the task ends so a crashed task doesn't keep the menu on "Stop Tracking"
+        if user['tasks'].get(wallet_address) is task:
+            del user['tasks'][wallet_address]
+
+    task = supervisor.start(
+        (chat_id, wallet_address),
+        lambda: start_periodic_task(chat_id, context, wallet_address, user_data),
+        on_give_up=notify_gave_up,
+    )
+    task.add_done_callback(forget_task)
+    user['tasks'][wallet_address] = task
+    return task
+
 
 # Modify the 'show_main_menu' function
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -288,8 +312,7 @@ async def start_tracking(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         task.cancel()
     user['tasks'] = {}
     # Start tracking the selected wallet
-    task = asyncio.create_task(start_periodic_task(chat_id, context, selected_wallet['address'], user_data))
-    user['tasks'][selected_wallet['address']] = task
+    launch_tracking(chat_id, context, selected_wallet)
     
    # Log that tracking has started in the terminal
     #print(f"Started tracking wallet: {selected_wallet['address']} (Name: {selected_wallet['name']})")
@@ -451,3 +474,64 @@ async def delete_wallet(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     escaped_wallet_address = escape_markdown(wallet_to_delete['address'], version=2)
     message = f"Wallet `{escaped_wallet_name}` with address `{escaped_wallet_address}` has been removed from the tracking list\\."
     await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN_V2)
+
+def parse_chat_ids(value: str) -> set:
+    chat_ids = set()
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            chat_ids.add(int(entry))
+        except ValueError:
+            logger.warning(f"Ignoring invalid chat id in ADMIN_CHAT_IDS: {entry!r}")
+    return chat_ids
+
+async def show_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.effective_chat.id not in context.bot_data.get('admin_chat_ids', set()):
+        return
+    await update.message.reply_text(supervisor.describe())
+
+def save_user_data(tracking: dict) -> None:
+    # Wallets, cursors and which wallets were being tracked survive a restart; menu state does not
+    path = os.getenv('USER_DATA_FILE', 'user_data.json')
+    data = {
+        str(chat_id): {
+            'tracked_wallets': user.get('tracked_wallets', []),
+            'last_transactions': user.get('last_transactions', {}),
+            'tracking': tracking.get(chat_id, []),
+        }
+        for chat_id, user in user_data.items()
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+    logger.info(f"Saved tracking state for {len(data)} chats to {path}")
+
+async def restore_user_data(application) -> None:
+    path = os.getenv('USER_DATA_FILE', 'user_data.json')
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        data = json.load(f)
+    resumed = 0
+    for chat_id, user in data.items():
+        chat_id = int(chat_id)
+        user_data[chat_id] = {
+            'tracked_wallets': user.get('tracked_wallets', []),
+            'tasks': {},
+            'last_transactions': user.get('last_transactions', {}),
+            'waiting_for_wallet': False
+        }
+        # Resume tracking from the saved cursors so notifications carry on across restarts
+        for wallet in user_data[chat_id]['tracked_wallets']:
+            if wallet['address'] in user.get('tracking', []):
+                launch_tracking(chat_id, application, wallet)
+                resumed += 1
+    logger.info(f"Restored tracking state for {len(data)} chats from {path}, resumed {resumed} tasks")
+
+async def shutdown_tracking(application) -> None:
+    # Note what was running before the drain ends it, let tasks send what they have, then write everything to disk
+    tracking = {chat_id: list(user.get('tasks', {})) for chat_id, user in user_data.items()}
+    await supervisor.shutdown()
+    save_user_data(tracking)
@@ -0,0 +1,193 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Supervisor limits, shared by every tracking task
+MAX_CONCURRENT_POLLS = 50  # Upper bound on poll cycles hitting the RPC at the same time
+GIVE_UP_AFTER = 1800  # Seconds of continuous failure before a task is given up
+BASE_BACKOFF = 2  # Seconds before the first restart, doubled on each consecutive failure
+MAX_BACKOFF = 300  # Cap on the restart delay, also the uptime after which a task counts as healthy again
+DRAIN_TIMEOUT = 15  # Seconds shutdown waits for tasks to finish their current cycle
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit on a single message
+MAX_ERROR_LENGTH = 100  # Characters of the last error shown per task in the admin view
+MAX_STORED_ERROR_LENGTH = 200  # Characters of the last error kept per task
+
+
+class TaskSupervisor:
+    """Runs background tracking coroutines with bounded concurrency and restarts.
+
+    Each task is keyed by (chat_id, wallet_address). A crashing coroutine is
+    restarted with exponential backoff until it has kept failing for
+    GIVE_UP_AFTER seconds; cancellation and a clean return end it for good.
+    Expected, transient errors should be handled inside the coroutine and
+    reported through ``record_error`` rather than raised.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_POLLS, give_up_after=GIVE_UP_AFTER,
+                 base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.max_concurrency = max_concurrency
+        self.give_up_after = give_up_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.tasks = {}  # (chat_id, wallet_address) -> asyncio.Task
+        self.stats = {}  # (chat_id, wallet_address) -> per-task counters
+        self.error_counts = collections.Counter()  # exception type name -> count
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._stopping = asyncio.Event()
+
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+
+    def start(self, key, coro_factory, on_give_up=None):
+        """Start supervising ``coro_factory()`` under ``key``, replacing any task already there.
+
+        ``on_give_up`` is awaited with the last exception once the task has failed for too long.
+        """
+        if self.stopping:
+            raise RuntimeError("Supervisor is shutting down")
+        old_task = self.tasks.get(key)
+        if old_task:
+            old_task.cancel()
+        self.stats[key] = {
+            'started_at': time.monotonic(),
+            'restarts': 0,
+            'errors': 0,
+            'last_error': None,
+        }
+        task = asyncio.create_task(self._supervise(key, coro_factory, on_give_up))
+        self.tasks[key] = task
+        task.add_done_callback(lambda t: self._reap(key, t))
+        return task
+
+    def stop(self, key):
+        task = self.tasks.get(key)
+        if task:
+            task.cancel()
+
+    def is_running(self, key):
+        task = self.tasks.get(key)
+        return bool(task and not task.done())
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the concurrency slots for the duration of a poll cycle.
+
+        Callers should check ``stopping`` once inside: a slot acquired after shutdown began must not start a poll.
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def wait_stopping(self, timeout):
+        """Sleep for ``timeout`` seconds, waking early on shutdown. Returns True if shutting down."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.stopping
+
+    def record_error(self, key, error):
+        """Count an error against ``key`` without restarting its task."""
+        self.error_counts[type(error).__name__] += 1
+        stats = self.stats.get(key)
+        if stats is not None:
+            stats['errors'] += 1
+            stats['last_error'] = f"{type(error).__name__}: {error}"[:MAX_STORED_ERROR_LENGTH]
+
+    async def _supervise(self, key, coro_factory, on_give_up):
+        stats = self.stats[key]
+        failures = 0
+        failing_since = None
+        while True:
+            run_started = time.monotonic()
+            try:
+                await coro_factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.record_error(key, e)
+                logger.exception(f"Tracking task {key} failed")
+                now = time.monotonic()
+                if failing_since is None or now - run_started >= self.max_backoff:
+                    # A run that stayed up longer than the backoff cap starts a fresh failure streak
+                    failures = 0
+                    failing_since = run_started
+                failures += 1
+                if self.stopping:
+                    return
+                if now - failing_since >= self.give_up_after:
+                    logger.error(f"Tracking task {key} gave up after failing for {int(now - failing_since)}s")
+                    if on_give_up:
+                        try:
+                            await on_give_up(e)
+                        except Exception:
+                            logger.exception(f"Give-up callback for {key} failed")
+                    return
+                delay = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+                if await self.wait_stopping(delay):
+                    return
+                stats['restarts'] += 1
+
+    def _reap(self, key, task):
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+            del self.stats[key]
+        if not task.cancelled() and task.exception():
+            logger.error(f"Supervisor for {key} crashed", exc_info=task.exception())
+
+    async def shutdown(self, drain_timeout=DRAIN_TIMEOUT):
+        """Let every task finish its current cycle, then cancel whatever is still running."""
+        self._stopping.set()
+        tasks = list(self.tasks.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=drain_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} tracking tasks that did not drain in time")
+
+    def describe(self, max_length=MAX_MESSAGE_LENGTH):
+        """Summary of live tasks and error counters for the admin view, noisiest tasks first.
+
+        Task lines are dropped once the text would exceed ``max_length``, so it always fits one Telegram message.
+        """
+        now = time.monotonic()
+        lines = [
+            f"Live tasks: {len(self.tasks)}",
+            f"Polls in flight: {self.in_flight}/{self.max_concurrency}",
+        ]
+        if self.error_counts:
+            counts = ", ".join(f"{name}={count}" for name, count in self.error_counts.most_common(10))
+            lines.append(f"Errors: {counts}")
+        noisiest = sorted(self.stats.items(), key=lambda item: item[1]['errors'], reverse=True)
+        # Leave room for the "... and N more" trailer
+        budget = max_length - sum(len(line) + 1 for line in lines) - 40
+        shown = 0
+        for (chat_id, wallet_address), stats in noisiest:
+            uptime = int(now - stats['started_at'])
+            line = (f"{chat_id} {wallet_address}: up {uptime}s, "
+                    f"restarts {stats['restarts']}, errors {stats['errors']}")
+            if stats['last_error']:
+                line += f", last error: {stats['last_error'][:MAX_ERROR_LENGTH]}"
+            if len(line) + 1 > budget:
+                break
+            budget -= len(line) + 1
+            lines.append(line)
+            shown += 1
+        if len(noisiest) > shown:
+            lines.append(f"... and {len(noisiest) - shown} more")
+        return "\n".join(lines)
+
+supervisor = TaskSupervisor()
@@ -1,16 +1,36 @@
 import asyncio
 import httpx
 import datetime
+import json
+import logging
 import pytz
 import cachetools.func
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
 from telegram.helpers import escape_markdown
 
+from helpers.task_supervisor import supervisor
+
+logger = logging.getLogger(__name__)
+
 # Set up necessary variables and cache
 url = "https://api.mainnet-beta.solana.com"
 headers = {"Content-Type": "application/json"}
 local_tz = pytz.timezone('Europe/Bucharest')  # Change to your timezone
 cache = cachetools.func.TTLCache(maxsize=1000, ttl=600)
+poll_interval = 5  # Seconds between checks for new transactions
+max_poll_backoff = 120  # Cap on the poll delay while the RPC keeps rate limiting us
+# Errors from a flaky RPC or Telegram API; the poll is retried next cycle instead of restarting the task.
+# BadRequest subclasses NetworkError but is permanent, so it is re-raised before this tuple is checked.
+transient_errors = (httpx.HTTPError, json.JSONDecodeError, NetworkError)
+
+class RpcError(Exception):
+    """Non-200 response from the Solana RPC."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"RPC returned HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
 
 def lamports_to_sol(lamports):
     return lamports / 1_000_000_000.0
@@ -35,79 +55,122 @@ async def get_transaction_details(signature):
             return data
 
 async def start_periodic_task(chat_id, context, wallet_address, user_data):
+    user = user_data[chat_id]
+    wallet_name = next((w['name'] for w in user['tracked_wallets'] if w['address'] == wallet_address), wallet_address)
+    key = (chat_id, wallet_address)
+    rate_limited = 0  # Consecutive 429 responses, used to back off the poll interval
     try:
-        user = user_data[chat_id]
-        last_transactions = user['last_transactions'].get(wallet_address, [])
-        wallet_name = next((w['name'] for w in user['tracked_wallets'] if w['address'] == wallet_address), wallet_address)
         while True:
-            payload_transactions = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "getConfirmedSignaturesForAddress2",
-                "params": [wallet_address, {"limit": 10}]
-            }
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload_transactions, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('result'):
-                    new_signatures = [tx['signature'] for tx in data['result']]
-                    # Log the list of the first 10 transactions
-                    print(f"Refreshed transactions for wallet {wallet_name} ({wallet_address}):")
-                    for idx, signature in enumerate(new_signatures):
-                        print(f"{idx+1}: {signature}")
-                    if not last_transactions:
-                        # First run, initialize last_transactions
-                        last_transactions = new_signatures
-                        user['last_transactions'][wallet_address] = last_transactions
-                    else:
-                        # Find new transactions
-                        new_tx_signatures = [sig for sig in new_signatures if sig not in last_transactions]
-                        if new_tx_signatures:
-                            # Process from oldest to newest
-                            for signature in reversed(new_tx_signatures):
-                                transaction_details = await get_transaction_details(signature)
-                                if transaction_details and 'result' in transaction_details:
-                                    transaction_info = transaction_details['result']
-                                    block_time = datetime.datetime.utcfromtimestamp(
-                                        transaction_info['blockTime']
-                                    ).replace(
-                                        tzinfo=pytz.utc
-                                    ).astimezone(
-                                        local_tz
-                                    ).strftime('%Y-%m-%d %H:%M:%S %Z') if 'blockTime' in transaction_info else "Unknown Time"
-                                    message_time = datetime.datetime.now(local_tz).strftime('%Y-%m-%d %H:%M:%S %Z')
-                                    message = f"Wallet: `{escape_markdown(wallet_name, version=2)}`\n"
-                                    message += f"Signature: `{escape_markdown(signature, version=2)}`\n"
+            delay = poll_interval
+            async with supervisor.slot():
+                # Tasks still queued for a slot when shutdown starts skip the poll; only in-flight cycles drain
+                if supervisor.stopping:
+                    return
+                try:
+                    await poll_wallet(chat_id, context, wallet_address, wallet_name, user)
+                    rate_limited = 0
+                except RpcError as e:
+                    supervisor.record_error(key, e)
+                    if e.status_code == 429:
+                        rate_limited += 1
+                        delay = min(poll_interval * 2 ** rate_limited, max_poll_backoff)
+                        delay = max(delay, e.retry_after or 0)
+                    logger.warning(f"Polling wallet {wallet_address} failed: {e}, retrying in {delay}s")
+                except RetryAfter as e:
+                    supervisor.record_error(key, e)
+                    delay = max(delay, retry_after_seconds(e))
+                    logger.warning(f"Telegram flood control for chat {chat_id}, waiting {delay}s")
+                except Forbidden as e:
+                    # The user blocked the bot; retrying cannot succeed and nobody is left to notify
+                    supervisor.record_error(key, e)
+                    logger.warning(f"Stopped tracking wallet {wallet_address} for chat {chat_id}: {e}")
+                    return
+                except BadRequest:
+                    raise
+                except transient_errors as e:
+                    supervisor.record_error(key, e)
+                    logger.warning(f"Polling wallet {wallet_address} failed, retrying next cycle: {e!r}")
+            # Wait before checking again, leaving early once shutdown starts
+            if await supervisor.wait_stopping(delay):
+                return
+    except asyncio.CancelledError:
+        logger.info(f"Tracking task for wallet {wallet_address} was cancelled.")
+        raise
 
-                                    for txn_detail in transaction_info.get('transaction', {}).get('message', {}).get('instructions', []):
-                                        if 'parsed' in txn_detail:
-                                            info = txn_detail['parsed']['info']
-                                            txn_type = txn_detail['parsed']['type']
-                                            message += f"Transaction Time: `{block_time}`\n" \
-                                                       f"Message Sent Time: `{message_time}`\n" \
-                                                       f"Type: `{txn_type}`\n"
+def retry_after_seconds(error):
+    # RetryAfter.retry_after is an int or a timedelta depending on the python-telegram-bot version
+    retry_after = error.retry_after
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return retry_after
 
-                                            if txn_type == 'transfer':
-                                                message += f"From: `{escape_markdown(info['source'], version=2)}`\n" \
-                                                           f"To: `{escape_markdown(info['destination'], version=2)}`\n" \
-                                                           f"Amount: `{lamports_to_sol(info['lamports']):.6f} SOL`\n"
-                                            # Add other transaction types as needed
-                                    print(message)
-                                    user['last_transactions'][wallet_address] = last_transactions
-                                    await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2)
-                            # Update last_transactions
-                            last_transactions = new_signatures
-                            user['last_transactions'][wallet_address] = last_transactions
+async def poll_wallet(chat_id, context, wallet_address, wallet_name, user):
+    last_transactions = user['last_transactions'].get(wallet_address, [])
+    payload_transactions = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getConfirmedSignaturesForAddress2",
+        "params": [wallet_address, {"limit": 10}]
+    }
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json=payload_transactions, headers=headers)
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('result'):
+            new_signatures = [tx['signature'] for tx in data['result']]
+            # Log the list of the first 10 transactions
+            print(f"Refreshed transactions for wallet {wallet_name} ({wallet_address}):")
+            for idx, signature in enumerate(new_signatures):
+                print(f"{idx+1}: {signature}")
+            if not last_transactions:
+                # First run, initialize last_transactions
+                last_transactions = new_signatures
+                user['last_transactions'][wallet_address] = last_transactions
             else:
-                message = f"Error: '{response.status_code}'\n"
-                print(message)
-                await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2)
-            await asyncio.sleep(5)  # Check for new transactions every 5 seconds
-    except:
-        print(f"Tracking task for wallet {wallet_address} was cancelled.")
-        # Clean up if necessary
-        raise
+                # Find new transactions
+                new_tx_signatures = [sig for sig in new_signatures if sig not in last_transactions]
+                if new_tx_signatures:
+                    # Process from oldest to newest
+                    for signature in reversed(new_tx_signatures):
+                        transaction_details = await get_transaction_details(signature)
+                        if transaction_details and 'result' in transaction_details:
+                            transaction_info = transaction_details['result']
+                            block_time = datetime.datetime.utcfromtimestamp(
+                                transaction_info['blockTime']
+                            ).replace(
+                                tzinfo=pytz.utc
+                            ).astimezone(
+                                local_tz
+                            ).strftime('%Y-%m-%d %H:%M:%S %Z') if 'blockTime' in transaction_info else "Unknown Time"
+                            message_time = datetime.datetime.now(local_tz).strftime('%Y-%m-%d %H:%M:%S %Z')
+                            message = f"Wallet: `{escape_markdown(wallet_name, version=2)}`\n"
+                            message += f"Signature: `{escape_markdown(signature, version=2)}`\n"
+
+                            for txn_detail in transaction_info.get('transaction', {}).get('message', {}).get('instructions', []):
+                                if 'parsed' in txn_detail:
+                                    info = txn_detail['parsed']['info']
+                                    txn_type = txn_detail['parsed']['type']
+                                    message += f"Transaction Time: `{block_time}`\n" \
+                                               f"Message Sent Time: `{message_time}`\n" \
+                                               f"Type: `{txn_type}`\n"
+
+                                    if txn_type == 'transfer':
+                                        message += f"From: `{escape_markdown(info['source'], version=2)}`\n" \
+                                                   f"To: `{escape_markdown(info['destination'], version=2)}`\n" \
+                                                   f"Amount: `{lamports_to_sol(info['lamports']):.6f} SOL`\n"
+                                    # Add other transaction types as needed
+                            print(message)
+                            await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2)
+                        # Advance the cursor per notification so a restart never resends it
+                        last_transactions = [signature] + last_transactions
+                        user['last_transactions'][wallet_address] = last_transactions
+                    # Update last_transactions
+                    last_transactions = new_signatures
+                    user['last_transactions'][wallet_address] = last_transactions
+    else:
+        # Counted and backed off by the caller; users are not messaged about RPC hiccups
+        retry_after = response.headers.get('Retry-After', '')
+        raise RpcError(response.status_code, int(retry_after) if retry_after.isdigit() else None)
 
 async def get_wallet_balance(wallet_address):
     payload = {
@@ -15,6 +15,10 @@ from helpers.menu_handlers import (
     track_wallet,
     list_wallets,
     delete_wallet,  # New import
+    show_tasks,
+    parse_chat_ids,
+    restore_user_data,
+    shutdown_tracking,
 )
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -23,6 +27,8 @@ from telegram.ext import ContextTypes
 load_dotenv()
 # Get the TELEGRAM_TOKEN from the environment variables
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+# Chats allowed to use the /tasks admin view
+ADMIN_CHAT_IDS = parse_chat_ids(os.getenv('ADMIN_CHAT_IDS', ''))
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -54,6 +60,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await show_main_menu(update, context)
         elif command == '/del':
             await delete_wallet(update, context)
+        elif command == '/tasks':
+            await show_tasks(update, context)
         # Add other commands as needed
     elif message.text and context.bot.username and f'@{context.bot.username}' in message.text:
         # The bot was tagged, but no specific command was given
@@ -63,7 +71,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
 def main():
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(restore_user_data)
+        .post_stop(shutdown_tracking)
+        .build()
+    )
+    application.bot_data['admin_chat_ids'] = ADMIN_CHAT_IDS
 
     # Command handlers
     application.add_handler(CommandHandler("start", start))
@@ -72,6 +87,7 @@ def main():
     application.add_handler(CommandHandler("listall", list_wallets))
     application.add_handler(CommandHandler("list", list_commands))
     application.add_handler(CommandHandler("del", delete_wallet))  # New command handler
+    application.add_handler(CommandHandler("tasks", show_tasks))  # Admin-only view of tracking tasks
 
     # Callback query handlers
     application.add_handler(CallbackQueryHandler(main_menu_handler, pattern='^(add_wallet|view_wallets|start_tracking|back_to_main)$'))
@@ -0,0 +1,84 @@
+import asyncio
+
+from helpers import menu_handlers
+from helpers.task_supervisor import TaskSupervisor
+
+WALLET = {'address': 'wallet', 'name': 'Main', 'checked': True}
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class FakeApplication:
+    def __init__(self):
+        self.bot = FakeBot()
+
+
+def test_user_data_round_trip_resumes_tracking(monkeypatch, tmp_path):
+    monkeypatch.setenv('USER_DATA_FILE', str(tmp_path / 'user_data.json'))
+    monkeypatch.setattr(menu_handlers, 'user_data', {
+        123: {
+            'tracked_wallets': [WALLET, {'address': 'idle', 'name': 'Idle', 'checked': False}],
+            'tasks': {},
+            'last_transactions': {'wallet': ['s2', 's1']},
+            'waiting_for_wallet': True,
+        },
+    })
+    menu_handlers.save_user_data({123: ['wallet']})
+
+    restored = {}
+    launched = []
+    monkeypatch.setattr(menu_handlers, 'user_data', restored)
+    monkeypatch.setattr(menu_handlers, 'launch_tracking', lambda *args: launched.append(args))
+    application = FakeApplication()
+    asyncio.run(menu_handlers.restore_user_data(application))
+
+    assert list(restored) == [123]
+    assert restored[123]['last_transactions'] == {'wallet': ['s2', 's1']}
+    assert restored[123]['tasks'] == {} and restored[123]['waiting_for_wallet'] is False
+    assert launched == [(123, application, WALLET)]
+
+
+def test_restore_without_a_file_is_a_no_op(monkeypatch, tmp_path):
+    monkeypatch.setenv('USER_DATA_FILE', str(tmp_path / 'missing.json'))
+    monkeypatch.setattr(menu_handlers, 'user_data', {})
+
+    asyncio.run(menu_handlers.restore_user_data(FakeApplication()))
+
+    assert menu_handlers.user_data == {}
+
+
+def test_finished_tasks_stop_counting_as_tracking(monkeypatch):
+    release = None
+
+    async def fake_tracker(chat_id, context, wallet_address, user_data):
+        await release.wait()
+        raise ValueError("boom")
+
+    monkeypatch.setattr(menu_handlers, 'user_data', {1: {'tracked_wallets': [WALLET], 'tasks': {}, 'last_transactions': {}}})
+    monkeypatch.setattr(menu_handlers, 'start_periodic_task', fake_tracker)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        supervisor = TaskSupervisor(give_up_after=0)
+        monkeypatch.setattr(menu_handlers, 'supervisor', supervisor)
+        application = FakeApplication()
+        task = menu_handlers.launch_tracking(1, application, WALLET)
+        await asyncio.sleep(0)
+        while_running = menu_handlers.is_tracking(1)
+        release.set()
+        await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), 1)
+        await asyncio.sleep(0)
+        return while_running, menu_handlers.is_tracking(1), application.bot.sent
+
+    while_running, after_crash, sent = asyncio.run(scenario())
+    assert while_running is True
+    assert after_crash is False
+    assert len(sent) == 1 and "after repeated errors" in sent[0][1]
+    assert menu_handlers.user_data[1]['tasks'] == {}
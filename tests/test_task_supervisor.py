@@ -0,0 +1,153 @@
+import asyncio
+
+from helpers.task_supervisor import TaskSupervisor
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_gives_up_after_failing_for_give_up_after():
+    async def scenario():
+        supervisor = TaskSupervisor(give_up_after=0.05, base_backoff=0.01, max_backoff=0.02)
+        given_up = []
+
+        async def failing():
+            raise ValueError("boom")
+
+        async def on_give_up(error):
+            given_up.append(error)
+
+        task = supervisor.start((1, 'wallet'), failing, on_give_up=on_give_up)
+        await asyncio.wait_for(task, 1)
+        await asyncio.sleep(0)
+        return supervisor, task, given_up
+
+    supervisor, task, given_up = run(scenario())
+    assert not task.cancelled()
+    assert len(given_up) == 1 and isinstance(given_up[0], ValueError)
+    assert supervisor.error_counts['ValueError'] >= 2
+    assert (1, 'wallet') not in supervisor.tasks
+    assert (1, 'wallet') not in supervisor.stats
+
+
+def test_long_healthy_run_resets_failure_streak():
+    async def scenario():
+        supervisor = TaskSupervisor(give_up_after=0.05, base_backoff=0.001, max_backoff=0.02)
+        given_up = []
+
+        async def fails_after_running():
+            await asyncio.sleep(0.03)
+            raise ValueError("boom")
+
+        async def on_give_up(error):
+            given_up.append(error)
+
+        task = supervisor.start((1, 'wallet'), fails_after_running, on_give_up=on_give_up)
+        await asyncio.sleep(0.2)
+        restarts = supervisor.stats[(1, 'wallet')]['restarts']
+        running = not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return restarts, running, given_up
+
+    restarts, running, given_up = run(scenario())
+    assert running
+    assert restarts >= 3
+    assert given_up == []
+
+
+def test_record_error_counts_without_restarting():
+    async def scenario():
+        supervisor = TaskSupervisor()
+        key = (1, 'wallet')
+
+        async def polling():
+            supervisor.record_error(key, ConnectionError("rpc down"))
+            await asyncio.sleep(10)
+
+        task = supervisor.start(key, polling)
+        await asyncio.sleep(0.01)
+        stats = dict(supervisor.stats[key])
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return supervisor, stats
+
+    supervisor, stats = run(scenario())
+    assert stats['errors'] == 1 and stats['restarts'] == 0
+    assert stats['last_error'] == "ConnectionError: rpc down"
+    assert supervisor.error_counts['ConnectionError'] == 1
+
+
+def test_replacing_a_task_reaps_only_the_old_one():
+    async def scenario():
+        supervisor = TaskSupervisor()
+        key = (1, 'wallet')
+
+        async def forever():
+            await asyncio.sleep(10)
+
+        first = supervisor.start(key, forever)
+        second = supervisor.start(key, forever)
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.sleep(0)
+        after_replace = (supervisor.tasks.get(key), key in supervisor.stats)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.sleep(0)
+        return first, second, after_replace, supervisor
+
+    first, second, after_replace, supervisor = run(scenario())
+    assert first.cancelled()
+    assert after_replace == (second, True)
+    assert supervisor.tasks == {} and supervisor.stats == {}
+
+
+def test_shutdown_cancels_tasks_that_do_not_drain():
+    async def scenario():
+        supervisor = TaskSupervisor()
+
+        async def ignores_shutdown():
+            await asyncio.sleep(10)
+
+        task = supervisor.start((1, 'wallet'), ignores_shutdown)
+        await asyncio.sleep(0)
+        await asyncio.wait_for(supervisor.shutdown(drain_timeout=0.05), 1)
+        return supervisor, task
+
+    supervisor, task = run(scenario())
+    assert task.cancelled()
+    assert supervisor.tasks == {}
+
+
+def test_start_refused_while_shutting_down():
+    async def scenario():
+        supervisor = TaskSupervisor()
+        await supervisor.shutdown()
+
+        async def noop():
+            pass
+
+        try:
+            supervisor.start((1, 'wallet'), noop)
+        except RuntimeError:
+            return True
+        return False
+
+    assert run(scenario())
+
+
+def test_describe_fits_one_telegram_message():
+    supervisor = TaskSupervisor()
+    for i in range(200):
+        supervisor.stats[(1_000_000_000 + i, 'A' * 44)] = {
+            'started_at': 0,
+            'restarts': 3,
+            'errors': 9,
+            'last_error': 'X' * 200,
+        }
+        supervisor.error_counts[f'Error{i}'] += 1
+
+    summary = supervisor.describe()
+    assert len(summary) <= 4096
+    assert summary.endswith("more")
@@ -0,0 +1,234 @@
+import asyncio
+
+import httpx
+import pytest
+from telegram.error import BadRequest, Forbidden, TimedOut
+
+from helpers import wallet_tracker
+from helpers.task_supervisor import TaskSupervisor
+
+WALLET = 'wallet'
+CHAT_ID = 1
+KEY = (CHAT_ID, WALLET)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeRpc:
+    """Stands in for httpx.AsyncClient; ``signatures`` answers getConfirmedSignaturesForAddress2."""
+
+    def __init__(self, signatures=(), delay=0):
+        self.signatures = list(signatures)
+        self.delay = delay
+        self.failures = []  # Exceptions or responses returned, one per call, before answering normally
+        self.polls = []  # Whether the supervisor was stopping when each poll started
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def post(self, url, json, headers):
+        if json['method'] == 'getTransaction':
+            return FakeResponse(data={'result': {'blockTime': 0, 'transaction': {'message': {'instructions': []}}}})
+        self.polls.append(wallet_tracker.supervisor.stopping)
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return FakeResponse(data={'result': [{'signature': sig} for sig in self.signatures]})
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.failures = {}  # Signature -> exception raised when notifying about it
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        for signature, error in list(self.failures.items()):
+            if signature in text:
+                del self.failures[signature]
+                raise error
+        self.sent.append(text)
+
+
+class FakeContext:
+    def __init__(self):
+        self.bot = FakeBot()
+
+
+class RecordingSupervisor(TaskSupervisor):
+    """Records every poll delay and reports shutdown after ``cycles`` waits."""
+
+    def __init__(self, cycles, **kwargs):
+        super().__init__(**kwargs)
+        self.cycles = cycles
+        self.delays = []
+
+    async def wait_stopping(self, timeout):
+        self.delays.append(timeout)
+        return len(self.delays) >= self.cycles
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    rpc = FakeRpc()
+    monkeypatch.setattr(wallet_tracker.httpx, 'AsyncClient', rpc)
+    wallet_tracker.cache.clear()
+    return rpc
+
+
+def make_user(last_transactions=None):
+    return {
+        'tracked_wallets': [{'address': WALLET, 'name': 'Main', 'checked': True}],
+        'tasks': {},
+        'last_transactions': {WALLET: last_transactions} if last_transactions else {},
+    }
+
+
+def sent_signatures(bot, signatures):
+    return [sig for text in bot.sent for sig in signatures if f"Signature: `{sig}`" in text]
+
+
+def test_first_poll_sets_cursor_without_notifying(rpc):
+    rpc.signatures = ['s2', 's1']
+    user = make_user()
+    context = FakeContext()
+
+    asyncio.run(wallet_tracker.poll_wallet(CHAT_ID, context, WALLET, 'Main', user))
+
+    assert user['last_transactions'][WALLET] == ['s2', 's1']
+    assert context.bot.sent == []
+
+
+def test_failed_notification_does_not_resend_earlier_ones(rpc):
+    rpc.signatures = ['s3', 's2', 's1', 'old']
+    user = make_user(['old'])
+    context = FakeContext()
+    context.bot.failures['s2'] = TimedOut()
+
+    with pytest.raises(TimedOut):
+        asyncio.run(wallet_tracker.poll_wallet(CHAT_ID, context, WALLET, 'Main', user))
+    assert sent_signatures(context.bot, ['s1', 's2', 's3']) == ['s1']
+    assert user['last_transactions'][WALLET] == ['s1', 'old']
+
+    asyncio.run(wallet_tracker.poll_wallet(CHAT_ID, context, WALLET, 'Main', user))
+    assert sent_signatures(context.bot, ['s1', 's2', 's3']) == ['s1', 's2', 's3']
+    assert user['last_transactions'][WALLET] == ['s3', 's2', 's1', 'old']
+
+
+def test_error_response_raises_rpc_error_without_messaging(rpc):
+    rpc.failures.append(FakeResponse(429, headers={'Retry-After': '30'}))
+    context = FakeContext()
+
+    with pytest.raises(wallet_tracker.RpcError) as excinfo:
+        asyncio.run(wallet_tracker.poll_wallet(CHAT_ID, context, WALLET, 'Main', make_user(['old'])))
+
+    assert (excinfo.value.status_code, excinfo.value.retry_after) == (429, 30)
+    assert context.bot.sent == []
+
+
+def run_tracker(monkeypatch, supervisor, user, context, run_for=None):
+    """Run start_periodic_task under ``supervisor`` until it ends, or for ``run_for`` seconds."""
+    monkeypatch.setattr(wallet_tracker, 'supervisor', supervisor)
+
+    async def scenario():
+        task = supervisor.start(KEY, lambda: wallet_tracker.start_periodic_task(CHAT_ID, context, WALLET, {CHAT_ID: user}))
+        if run_for is None:
+            await asyncio.wait_for(task, 1)
+            return None
+        await asyncio.sleep(run_for)
+        stats = dict(supervisor.stats[KEY])
+        await supervisor.shutdown(drain_timeout=1)
+        return stats
+
+    return asyncio.run(scenario())
+
+
+def test_transient_errors_are_counted_and_retried_in_place(monkeypatch, rpc):
+    rpc.signatures = ['s1']
+    rpc.failures.append(httpx.ConnectError("rpc down"))
+    monkeypatch.setattr(wallet_tracker, 'poll_interval', 0.01)
+    user = make_user()
+
+    stats = run_tracker(monkeypatch, TaskSupervisor(), user, FakeContext(), run_for=0.1)
+
+    assert stats['errors'] == 1 and stats['restarts'] == 0
+    assert stats['last_error'].startswith('ConnectError')
+    assert user['last_transactions'][WALLET] == ['s1']
+
+
+def test_bad_request_restarts_the_task(monkeypatch, rpc):
+    rpc.signatures = ['s1', 'old']
+    context = FakeContext()
+    context.bot.failures['s1'] = BadRequest("Can't parse entities")
+    monkeypatch.setattr(wallet_tracker, 'poll_interval', 0.01)
+    supervisor = TaskSupervisor(base_backoff=0.01)
+
+    stats = run_tracker(monkeypatch, supervisor, make_user(['old']), context, run_for=0.1)
+
+    assert stats['restarts'] == 1
+    assert supervisor.error_counts['BadRequest'] == 1
+
+
+def test_forbidden_ends_the_task(monkeypatch, rpc):
+    rpc.signatures = ['s1', 'old']
+    context = FakeContext()
+    context.bot.failures['s1'] = Forbidden("bot was blocked by the user")
+    supervisor = TaskSupervisor()
+
+    run_tracker(monkeypatch, supervisor, make_user(['old']), context)
+
+    assert supervisor.error_counts['Forbidden'] == 1
+    assert KEY not in supervisor.tasks
+
+
+def test_rate_limiting_backs_off_the_poll_interval(monkeypatch, rpc):
+    rpc.signatures = ['s1']
+    rpc.failures.extend([FakeResponse(429), FakeResponse(429), FakeResponse(429, headers={'Retry-After': '100'})])
+    supervisor = RecordingSupervisor(cycles=4)
+
+    run_tracker(monkeypatch, supervisor, make_user(), FakeContext())
+
+    interval = wallet_tracker.poll_interval
+    assert supervisor.delays == [interval * 2, interval * 4, 100, interval]
+    assert supervisor.error_counts['RpcError'] == 3
+
+
+def test_shutdown_drains_only_polls_already_in_flight(monkeypatch, rpc):
+    rpc.signatures = ['s1']
+    rpc.delay = 0.1
+    supervisor = TaskSupervisor(max_concurrency=2)
+    monkeypatch.setattr(wallet_tracker, 'supervisor', supervisor)
+    users = {chat_id: make_user() for chat_id in range(10)}
+
+    async def scenario():
+        for chat_id in users:
+            supervisor.start(
+                (chat_id, WALLET),
+                lambda chat_id=chat_id: wallet_tracker.start_periodic_task(chat_id, FakeContext(), WALLET, users),
+            )
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await supervisor.shutdown(drain_timeout=1)
+        return loop.time() - started
+
+    elapsed = asyncio.run(scenario())
+    assert rpc.polls == [False, False]
+    assert elapsed < 0.5
+    assert supervisor.tasks == {}